@@ -5,37 +5,75 @@
 # pylint: disable=too-many-lines
 
 import base64
-import binascii
-import configparser
+import functools
+import gzip
 import hashlib
 import hmac
+import math
+import struct
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from http import HTTPStatus
-from http.server import BaseHTTPRequestHandler
-from http.server import ThreadingHTTPServer as HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from json import dumps as json_dumps
-from queue import Queue
-from threading import Event, Lock, Thread
-from time import sleep, time
-from typing import Dict, List, Optional, Union, override
-from urllib.parse import parse_qs
+from queue import Empty, Queue
+from threading import BoundedSemaphore, Condition, Event, Lock, Thread, stack_size
+from time import localtime, monotonic, sleep, time_ns
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    override,
+)
+from urllib.parse import parse_qsl
 
 from pymodbus.client import ModbusSerialClient as ModbusClient
 from pymodbus.exceptions import ModbusException
 
+import hash_pass
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dump_json(value: Any) -> bytes:
+    """Serializes a value to indented JSON bytes, using orjson when available.
+
+    Args:
+        value (Any): The value to serialize."""
+    if orjson is not None:
+        # pylint: disable-next=no-member
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2)
+    return json_dumps(value, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+TRUE_STRINGS = frozenset(("yes", "true", "t", "1"))
+FALSE_STRINGS = frozenset(("no", "false", "f", "0"))
+
 
 def str2bool(value: Union[str, bool, int]) -> bool:
     """Converts a string to a boolean value."""
     if isinstance(value, (bool, int)):
         return bool(value)
+    if not isinstance(value, str):
+        raise ValueError("Boolean value expected")
 
-    if value.lower() in ("yes", "true", "t", "1"):
+    value = value.lower()
+    if value in TRUE_STRINGS:
         return True
 
-    if value.lower() in ("no", "false", "f", "0"):
+    if value in FALSE_STRINGS:
         return False
 
     raise ValueError("Boolean value expected")
@@ -55,6 +93,20 @@ class RegType(Enum):
     CHAR = 2
 
 
+class RegDef(NamedTuple):
+    """Register definition.
+
+    The raw value is divided by scale unless a special function is given,
+    in which case the raw value is passed to it instead."""
+
+    start: int
+    length: int
+    type_: RegType
+    scale: int = 1
+    special: Optional[Callable[[Any], Any]] = None
+    write: Optional[Callable[[Any], Any]] = None  # None if not writeable
+
+
 ## Input Registers ##
 SystemStatusR = {
     0: "Standby",
@@ -72,72 +124,72 @@ SystemStatusR = {
     12: "PV Charging+Loads Supporting",
     13: "Export to Grid",
 }
-InputRegisters = {
-    # Register: (Start, Length, Type, PostProcess)
-    # fmt: off
-    "SystemStatus": (0, 1, RegType.UINT, lambda x: SystemStatusR[x]),
-    "PV1Volt": (1, 1, RegType.UINT, lambda x: x / 10),
-    "PV2Volt": (2, 1, RegType.UINT, lambda x: x / 10),
-    "PV1Watt": (3, 2, RegType.UINT, lambda x: x / 10),
-    "PV2Watt": (5, 2, RegType.UINT, lambda x: x / 10),
-    "PV1Amps": (7, 1, RegType.UINT, lambda x: x / 10),
-    "PV2Amps": (8, 1, RegType.UINT, lambda x: x / 10),
-    "OutputWatt": (9, 2, RegType.UINT, lambda x: x / 10),
-    "OutputVA": (11, 2, RegType.UINT, lambda x: x / 10),
-    "ACChrWatt": (13, 2, RegType.UINT, lambda x: x / 10),
-    "ACChrVA": (15, 2, RegType.UINT, lambda x: x / 10),
-    "BatteryVolt": (17, 1, RegType.UINT, lambda x: x / 100),
-    "BatterySOC": (18, 1, RegType.UINT, int),
-    "BusVolt": (19, 1, RegType.UINT, lambda x: x / 10),
-    "GridVolt": (20, 1, RegType.UINT, lambda x: x / 10),
-    "LineFreq": (21, 1, RegType.UINT, lambda x: x / 100),
-    "OutputACVolt": (22, 1, RegType.UINT, lambda x: x / 10),
-    "OutputACFreq": (23, 1, RegType.UINT, lambda x: x / 100),
-    "OutputDCVolt": (24, 1, RegType.UINT, lambda x: x / 10),
-    "InvTempC": (25, 1, RegType.INT, lambda x: x / 10),
-    "DCDCTempC": (26, 1, RegType.INT, lambda x: x / 10),
-    "LoadPercent": (27, 1, RegType.UINT, lambda x: x / 10),
-    "BatteryPortVolt": (28, 1, RegType.UINT, lambda x: x / 100),
-    "BatteryBusVolt": (29, 1, RegType.UINT, lambda x: x / 100),
-    "WorkTimeTotalSeconds": (30, 2, RegType.UINT, lambda x: x / 2),
-    "Buck1TempC": (32, 1, RegType.INT, lambda x: x / 10),
-    "Buck2TempC": (33, 1, RegType.INT, lambda x: x / 10),
-    "OutputAmps": (34, 1, RegType.UINT, lambda x: x / 10),
-    "InvAmps": (35, 1, RegType.UINT, lambda x: x / 10),
-    "ACInputWatt": (36, 2, RegType.INT, lambda x: x / 10), # > 0: From Grid, < 0: To Grid
-    "ACInputVA": (38, 2, RegType.UINT, lambda x: x / 10),
-    "FaultBit": (40, 1, RegType.UINT, int),
-    "WarningBit": (41, 1, RegType.UINT, int),
-    "WarningBitHigh": (42, 1, RegType.UINT, int),
-    "WarningValue": (43, 1, RegType.UINT, int),
-    "DeviceTypeCode": (44, 1, RegType.UINT, int),
-    "ExportToGridTodaykWh": (45, 1, RegType.UINT, lambda x: x / 10),
-    "ExportToGridTotalkWh": (46, 2, RegType.UINT, lambda x: x / 10),
-    "PV1EnergyTodaykWh": (48, 2, RegType.UINT, lambda x: x / 10),
-    "PV1EnergyTotalkWh": (50, 2, RegType.UINT, lambda x: x / 10),
-    "PV2EnergyTodaykWh": (52, 2, RegType.UINT, lambda x: x / 10),
-    "PV2EnergyTotalkWh": (54, 2, RegType.UINT, lambda x: x / 10),
-    "ACChargeEnergyTodaykWh": (56, 2, RegType.UINT, lambda x: x / 10),
-    "ACChargeEnergyTotalkWh": (58, 2, RegType.UINT, lambda x: x / 10),
-    "BatteryDischargeEnergyTodaykWh": (60, 2, RegType.UINT, lambda x: x / 10),
-    "BatteryDischargeEnergyTotalkWh": (62, 2, RegType.UINT, lambda x: x / 10),
-    "ACDischargeEnergyTodaykWh": (64, 2, RegType.UINT, lambda x: x / 10),
-    "ACDischargeEnergyTotalkWh": (66, 2, RegType.UINT, lambda x: x / 10),
-    "ACChargeBatteryAmps": (68, 1, RegType.UINT, lambda x: x / 10),
-    "ACDischargeWatt": (69, 2, RegType.UINT, lambda x: x / 10),
-    "ACDischargeVA": (71, 2, RegType.UINT, lambda x: x / 10),
-    "BatteryDischargeWatt": (73, 2, RegType.UINT, lambda x: x / 10),
-    "BatteryDischargeVA": (75, 2, RegType.UINT, lambda x: x / 10),
-    "BatteryWatt": (77, 2, RegType.INT, lambda x: x / 10), # > 0: Discharge, < 0: Charge
-    "MpptFanSpeedPercent": (81, 1, RegType.UINT, int),
-    "InvFanSpeedPercent": (82, 1, RegType.UINT, int),
-    "TotalChargeAmps": (83, 1, RegType.UINT, lambda x: x / 10),
-    "TotalDischargeAmps": (84, 1, RegType.UINT, lambda x: x / 10),
-    "OPDischargeEnergyTodaykWh": (85, 2, RegType.UINT, lambda x: x / 10),
-    "OPDischargeEnergyTotalkWh": (87, 2, RegType.UINT, lambda x: x / 10),
-    "ParaSystemChargeAmps": (90, 1, RegType.UINT, lambda x: x / 10),
-    # fmt: on
-}
+# fmt: off
+InputRegisters = MappingProxyType({
+    # Register: RegDef(Start, Length, Type, Scale, Special)
+    "SystemStatus": RegDef(0, 1, RegType.UINT, special=SystemStatusR.__getitem__),
+    "PV1Volt": RegDef(1, 1, RegType.UINT, 10),
+    "PV2Volt": RegDef(2, 1, RegType.UINT, 10),
+    "PV1Watt": RegDef(3, 2, RegType.UINT, 10),
+    "PV2Watt": RegDef(5, 2, RegType.UINT, 10),
+    "PV1Amps": RegDef(7, 1, RegType.UINT, 10),
+    "PV2Amps": RegDef(8, 1, RegType.UINT, 10),
+    "OutputWatt": RegDef(9, 2, RegType.UINT, 10),
+    "OutputVA": RegDef(11, 2, RegType.UINT, 10),
+    "ACChrWatt": RegDef(13, 2, RegType.UINT, 10),
+    "ACChrVA": RegDef(15, 2, RegType.UINT, 10),
+    "BatteryVolt": RegDef(17, 1, RegType.UINT, 100),
+    "BatterySOC": RegDef(18, 1, RegType.UINT),
+    "BusVolt": RegDef(19, 1, RegType.UINT, 10),
+    "GridVolt": RegDef(20, 1, RegType.UINT, 10),
+    "LineFreq": RegDef(21, 1, RegType.UINT, 100),
+    "OutputACVolt": RegDef(22, 1, RegType.UINT, 10),
+    "OutputACFreq": RegDef(23, 1, RegType.UINT, 100),
+    "OutputDCVolt": RegDef(24, 1, RegType.UINT, 10),
+    "InvTempC": RegDef(25, 1, RegType.INT, 10),
+    "DCDCTempC": RegDef(26, 1, RegType.INT, 10),
+    "LoadPercent": RegDef(27, 1, RegType.UINT, 10),
+    "BatteryPortVolt": RegDef(28, 1, RegType.UINT, 100),
+    "BatteryBusVolt": RegDef(29, 1, RegType.UINT, 100),
+    "WorkTimeTotalSeconds": RegDef(30, 2, RegType.UINT, 2),
+    "Buck1TempC": RegDef(32, 1, RegType.INT, 10),
+    "Buck2TempC": RegDef(33, 1, RegType.INT, 10),
+    "OutputAmps": RegDef(34, 1, RegType.UINT, 10),
+    "InvAmps": RegDef(35, 1, RegType.UINT, 10),
+    "ACInputWatt": RegDef(36, 2, RegType.INT, 10), # > 0: From Grid, < 0: To Grid
+    "ACInputVA": RegDef(38, 2, RegType.UINT, 10),
+    "FaultBit": RegDef(40, 1, RegType.UINT),
+    "WarningBit": RegDef(41, 1, RegType.UINT),
+    "WarningBitHigh": RegDef(42, 1, RegType.UINT),
+    "WarningValue": RegDef(43, 1, RegType.UINT),
+    "DeviceTypeCode": RegDef(44, 1, RegType.UINT),
+    "ExportToGridTodaykWh": RegDef(45, 1, RegType.UINT, 10),
+    "ExportToGridTotalkWh": RegDef(46, 2, RegType.UINT, 10),
+    "PV1EnergyTodaykWh": RegDef(48, 2, RegType.UINT, 10),
+    "PV1EnergyTotalkWh": RegDef(50, 2, RegType.UINT, 10),
+    "PV2EnergyTodaykWh": RegDef(52, 2, RegType.UINT, 10),
+    "PV2EnergyTotalkWh": RegDef(54, 2, RegType.UINT, 10),
+    "ACChargeEnergyTodaykWh": RegDef(56, 2, RegType.UINT, 10),
+    "ACChargeEnergyTotalkWh": RegDef(58, 2, RegType.UINT, 10),
+    "BatteryDischargeEnergyTodaykWh": RegDef(60, 2, RegType.UINT, 10),
+    "BatteryDischargeEnergyTotalkWh": RegDef(62, 2, RegType.UINT, 10),
+    "ACDischargeEnergyTodaykWh": RegDef(64, 2, RegType.UINT, 10),
+    "ACDischargeEnergyTotalkWh": RegDef(66, 2, RegType.UINT, 10),
+    "ACChargeBatteryAmps": RegDef(68, 1, RegType.UINT, 10),
+    "ACDischargeWatt": RegDef(69, 2, RegType.UINT, 10),
+    "ACDischargeVA": RegDef(71, 2, RegType.UINT, 10),
+    "BatteryDischargeWatt": RegDef(73, 2, RegType.UINT, 10),
+    "BatteryDischargeVA": RegDef(75, 2, RegType.UINT, 10),
+    "BatteryWatt": RegDef(77, 2, RegType.INT, 10), # > 0: Discharge, < 0: Charge
+    "MpptFanSpeedPercent": RegDef(81, 1, RegType.UINT),
+    "InvFanSpeedPercent": RegDef(82, 1, RegType.UINT),
+    "TotalChargeAmps": RegDef(83, 1, RegType.UINT, 10),
+    "TotalDischargeAmps": RegDef(84, 1, RegType.UINT, 10),
+    "OPDischargeEnergyTodaykWh": RegDef(85, 2, RegType.UINT, 10),
+    "OPDischargeEnergyTotalkWh": RegDef(87, 2, RegType.UINT, 10),
+    "ParaSystemChargeAmps": RegDef(90, 1, RegType.UINT, 10),
+})
+# fmt: on
 
 ## Holding Registers ##
 OutputConfigR = {0: "SBU", 1: "SOL", 2: "UTI", 3: "SUB"}
@@ -171,111 +223,233 @@ AgingModeW = {v: k for k, v in AgingModeR.items()}
 SafetyTypeR = {1: "Standard", 2: "ETL", 3: "AS4777", 4: "CQC", 5: "VDE4105"}
 SafetyTypeW = {v: k for k, v in SafetyTypeR.items()}
 OnOffR = {0x0000: "Output enable", 0x0100: "Output disable"}
-HoldingAndWriteRegisters = {
-    # Register: (Start, Length, Type, ReadPostProcess, WritePreProcess (None if not writeable))
-    # fmt: off
-    "OnOff": (0, 1, RegType.UINT, lambda x: OnOffR[x], None),
-    "OutputConfig": (1, 1, RegType.UINT, lambda x: OutputConfigR[x], lambda x: OutputConfigW[x]),
-    "ChargeConfig": (2, 1, RegType.UINT, lambda x: ChargeConfigR[x], lambda x: ChargeConfigW[x]),
-    "UtiOutStart": (3, 1, RegType.UINT, int, int),     # 0-23
-    "UtiOutEnd": (4, 1, RegType.UINT, int, int),       # 0-23
-    "UtiChargeStart": (5, 1, RegType.UINT, int, int),  # 0-23
-    "UtiChargeEnd": (6, 1, RegType.UINT, int, int),    # 0-23
-    "PVModel": (7, 1, RegType.UINT, lambda x: PVModelR[x], lambda x: PVModelW[x]),
-    "ACInModel": (8, 1, RegType.UINT, lambda x: ACInModelR[x], lambda x: ACInModelW[x]),
-    "FWVersion": (9, 3, RegType.CHAR, str, None),
-    "FWVersion2": (12, 3, RegType.CHAR, str, None),
-    "LCDLanguage": (15, 1, RegType.UINT, int, int),
-    "GridV_Adj": (16, 1, RegType.UINT, int, None),
-    "InvV_Adj": (17, 1, RegType.UINT, int, None),
-    "OutputVoltType": (18, 1, RegType.UINT,
-                       lambda x: OutputVoltTypeR[x],
-                       lambda x: OutputVoltTypeW[x]),
-    "OutputFreqType": (19, 1, RegType.UINT,
-                       lambda x: OutputFreqTypeR[x],
-                       lambda x: OutputFreqTypeW[x]),
-    "OverLoadRestart": (20, 1, RegType.UINT,
-                        lambda x: OverLoadRestartR[x],
-                        lambda x: OverLoadRestartW[x]),
-    "OverTempRestart": (21, 1, RegType.UINT,
-                        lambda x: OverTempRestartR[x],
-                        lambda x: OverTempRestartW[str2bool(x)]),
-    "BuzzerEnable": (22, 1, RegType.UINT, bool, str2bool2int),
-    "SerialNumber": (23, 5, RegType.CHAR, str, str),
-    "MoudleH": (28, 1, RegType.UINT, int, int),
-    "MoudleL": (29, 1, RegType.UINT, int, int),
-    "ComAddress": (30, 1, RegType.UINT, int, int),
-    "FlashStart": (31, 1, RegType.UINT, int, int),
-    "ResetUserInfo": (32, 1, RegType.UINT, int, int),
-    "ResetToFactory": (33, 1, RegType.UINT, int, int),
-    "MaxChargeAmps": (34, 1, RegType.UINT, int, int),
-    "BulkChargeVolt": (35, 1, RegType.UINT, lambda x: x / 10, lambda x: int(x) * 10),
-    "FloatChargeVolt": (36, 1, RegType.UINT, lambda x: x / 10, lambda x: int(x) * 10),
-    "BatLowtoUti": (37, 1, RegType.UINT, lambda x: x / 10, lambda x: int(x) * 10),
-    "ACChargeAmps": (38, 1, RegType.UINT, int, int),
-    "BatteryType": (39, 1, RegType.UINT, lambda x: BatteryTypeR[x], lambda x: BatteryTypeW[x]),
-    "AgingMode": (40, 1, RegType.UINT, lambda x: AgingModeR[x], lambda x: AgingModeW[x]),
-    "FunctionMask": (41, 1, RegType.UINT, int, int),
-    "SafetyType": (42, 1, RegType.UINT, lambda x: SafetyTypeR[x], lambda x: SafetyTypeW[x]),
-    "DTC": (43, 1, RegType.UINT, int, None),
-    "SysYear": (45, 1, RegType.UINT, int, int),
-    "SysMonth": (46, 1, RegType.UINT, int, int),
-    "SysDay": (47, 1, RegType.UINT, int, int),
-    "SysHour": (48, 1, RegType.UINT, int, int),
-    "SysMin": (49, 1, RegType.UINT, int, int),
-    "SysSec": (50, 1, RegType.UINT, int, int),
-    #"uwAcVoltHighL": (51, 1, RegType.UINT, int, None),
-    #"uwAcVoltLowL": (52, 1, RegType.UINT, int, None),
-    #"uwAcFreqHighL": (53, 1, RegType.UINT, int, None),
-    #"uwAcFreqLowL": (54, 1, RegType.UINT, int, None),
-    #"ManufacturerInfo": (59, 8, RegType.CHAR, str, None),
-    #"FWBuildNo4": (67, 1, RegType.UINT, int, None),
-    #"FWBuildNo3": (68, 1, RegType.UINT, int, None),
-    #"FWBuildNo2": (69, 1, RegType.UINT, int, None),
-    #"FWBuildNo1": (70, 1, RegType.UINT, int, None),
-    "SysWeekly": (72, 1, RegType.UINT, int, int),
-    "ModbusVersion": (73, 1, RegType.UINT, lambda x: x / 100, None),
-    "SCC_ComMode": (75, 1, RegType.UINT, int, None),
-    "RateWatt": (76, 2, RegType.UINT, lambda x: x / 10, None),
-    "RateVA": (78, 2, RegType.UINT, lambda x: x / 10, None),
-    "ComboardVer": (80, 1, RegType.UINT, int, None),
-    "uwBatPieceNum": (81, 1, RegType.UINT, int, int),
-    "wBatLowCutOff": (82, 1, RegType.UINT, lambda x: x / 10, None),
-    #"NomGridVolt": (84, 1, RegType.UINT, int, None),
-    #"NomGridFreq": (85, 1, RegType.UINT, int, None),
-    #"NomBatVolt": (86, 1, RegType.UINT, int, None),
-    #"NomPvAmps": (87, 1, RegType.UINT, int, None),
-    #"NomAcChgAmps": (88, 1, RegType.UINT, int, None),
-    #"NomOpVolt": (89, 1, RegType.UINT, int, None),
-    #"NomOpFreq": (90, 1, RegType.UINT, int, None),
-    #"NomOpPow": (91, 1, RegType.UINT, int, None),
-    "uwAC2BatVolt": (95, 1, RegType.UINT, lambda x: x / 10, lambda x: int(x) * 10),
-    "BypEnable": (96, 1, RegType.UINT, bool, str2bool2int),
-    "PowSavingEnable": (97, 1, RegType.UINT, bool, str2bool2int),
-    "SpowBalEnable": (98, 1, RegType.UINT, bool, str2bool2int),
-    "ClrEnergyToday": (99, 1, RegType.UINT, bool, str2bool2int),
-    "ClrEnergyAll": (100, 1, RegType.UINT, bool, str2bool2int),
-    "BurnInTestEnable": (101, 1, RegType.UINT, bool, str2bool2int),
-    "ManualStartEnable": (102, 1, RegType.UINT, bool, str2bool2int),
-    "SciLossChkEnable": (103, 1, RegType.UINT, bool, str2bool2int),
-    "BlightEnable": (104, 1, RegType.UINT, bool, str2bool2int),
-    "ParaMaxChgAmps": (105, 1, RegType.UINT, int, None),
-    "LiProtocolType": (106, 1, RegType.UINT, int, int),
-    "AudioAlarmEnable": (107, 1, RegType.UINT, bool, str2bool2int),
-    "uwEqEnable": (108, 1, RegType.UINT, bool, str2bool2int),
-    "uwEqChgVolt": (109, 1, RegType.UINT, int, int),
-    "uwEqTime": (110, 1, RegType.UINT, int, int),
-    "uwEqTimeOut": (111, 1, RegType.UINT, int, int),
-    "uwEqInterval": (112, 1, RegType.UINT, int, int),
-    "uwMaxDisChgAmps": (113, 1, RegType.UINT, int, int),
-    "BLVersion2": (162, 1, RegType.UINT, int, None),
-    # fmt: on
-}
+# fmt: off
+HoldingAndWriteRegisters = MappingProxyType({
+    # Register: RegDef(Start, Length, Type, Scale, Special, Write (None if not writeable))
+    "OnOff": RegDef(0, 1, RegType.UINT, special=OnOffR.__getitem__),
+    "OutputConfig": RegDef(1, 1, RegType.UINT,
+                           special=OutputConfigR.__getitem__,
+                           write=OutputConfigW.__getitem__),
+    "ChargeConfig": RegDef(2, 1, RegType.UINT,
+                           special=ChargeConfigR.__getitem__,
+                           write=ChargeConfigW.__getitem__),
+    "UtiOutStart": RegDef(3, 1, RegType.UINT, write=int),     # 0-23
+    "UtiOutEnd": RegDef(4, 1, RegType.UINT, write=int),       # 0-23
+    "UtiChargeStart": RegDef(5, 1, RegType.UINT, write=int),  # 0-23
+    "UtiChargeEnd": RegDef(6, 1, RegType.UINT, write=int),    # 0-23
+    "PVModel": RegDef(7, 1, RegType.UINT,
+                      special=PVModelR.__getitem__,
+                      write=PVModelW.__getitem__),
+    "ACInModel": RegDef(8, 1, RegType.UINT,
+                        special=ACInModelR.__getitem__,
+                        write=ACInModelW.__getitem__),
+    "FWVersion": RegDef(9, 3, RegType.CHAR),
+    "FWVersion2": RegDef(12, 3, RegType.CHAR),
+    "LCDLanguage": RegDef(15, 1, RegType.UINT, write=int),
+    "GridV_Adj": RegDef(16, 1, RegType.UINT),
+    "InvV_Adj": RegDef(17, 1, RegType.UINT),
+    "OutputVoltType": RegDef(18, 1, RegType.UINT,
+                             special=OutputVoltTypeR.__getitem__,
+                             write=OutputVoltTypeW.__getitem__),
+    "OutputFreqType": RegDef(19, 1, RegType.UINT,
+                             special=OutputFreqTypeR.__getitem__,
+                             write=OutputFreqTypeW.__getitem__),
+    "OverLoadRestart": RegDef(20, 1, RegType.UINT,
+                              special=OverLoadRestartR.__getitem__,
+                              write=OverLoadRestartW.__getitem__),
+    "OverTempRestart": RegDef(21, 1, RegType.UINT,
+                              special=OverTempRestartR.__getitem__,
+                              write=lambda x: OverTempRestartW[str2bool(x)]),
+    "BuzzerEnable": RegDef(22, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "SerialNumber": RegDef(23, 5, RegType.CHAR, write=str),
+    "MoudleH": RegDef(28, 1, RegType.UINT, write=int),
+    "MoudleL": RegDef(29, 1, RegType.UINT, write=int),
+    "ComAddress": RegDef(30, 1, RegType.UINT, write=int),
+    "FlashStart": RegDef(31, 1, RegType.UINT, write=int),
+    "ResetUserInfo": RegDef(32, 1, RegType.UINT, write=int),
+    "ResetToFactory": RegDef(33, 1, RegType.UINT, write=int),
+    "MaxChargeAmps": RegDef(34, 1, RegType.UINT, write=int),
+    "BulkChargeVolt": RegDef(35, 1, RegType.UINT, 10, write=lambda x: int(x) * 10),
+    "FloatChargeVolt": RegDef(36, 1, RegType.UINT, 10, write=lambda x: int(x) * 10),
+    "BatLowtoUti": RegDef(37, 1, RegType.UINT, 10, write=lambda x: int(x) * 10),
+    "ACChargeAmps": RegDef(38, 1, RegType.UINT, write=int),
+    "BatteryType": RegDef(39, 1, RegType.UINT,
+                          special=BatteryTypeR.__getitem__,
+                          write=BatteryTypeW.__getitem__),
+    "AgingMode": RegDef(40, 1, RegType.UINT,
+                        special=AgingModeR.__getitem__,
+                        write=AgingModeW.__getitem__),
+    "FunctionMask": RegDef(41, 1, RegType.UINT, write=int),
+    "SafetyType": RegDef(42, 1, RegType.UINT,
+                         special=SafetyTypeR.__getitem__,
+                         write=SafetyTypeW.__getitem__),
+    "DTC": RegDef(43, 1, RegType.UINT),
+    "SysYear": RegDef(45, 1, RegType.UINT, write=int),
+    "SysMonth": RegDef(46, 1, RegType.UINT, write=int),
+    "SysDay": RegDef(47, 1, RegType.UINT, write=int),
+    "SysHour": RegDef(48, 1, RegType.UINT, write=int),
+    "SysMin": RegDef(49, 1, RegType.UINT, write=int),
+    "SysSec": RegDef(50, 1, RegType.UINT, write=int),
+    #"uwAcVoltHighL": RegDef(51, 1, RegType.UINT),
+    #"uwAcVoltLowL": RegDef(52, 1, RegType.UINT),
+    #"uwAcFreqHighL": RegDef(53, 1, RegType.UINT),
+    #"uwAcFreqLowL": RegDef(54, 1, RegType.UINT),
+    #"ManufacturerInfo": RegDef(59, 8, RegType.CHAR),
+    #"FWBuildNo4": RegDef(67, 1, RegType.UINT),
+    #"FWBuildNo3": RegDef(68, 1, RegType.UINT),
+    #"FWBuildNo2": RegDef(69, 1, RegType.UINT),
+    #"FWBuildNo1": RegDef(70, 1, RegType.UINT),
+    "SysWeekly": RegDef(72, 1, RegType.UINT, write=int),
+    "ModbusVersion": RegDef(73, 1, RegType.UINT, 100),
+    "SCC_ComMode": RegDef(75, 1, RegType.UINT),
+    "RateWatt": RegDef(76, 2, RegType.UINT, 10),
+    "RateVA": RegDef(78, 2, RegType.UINT, 10),
+    "ComboardVer": RegDef(80, 1, RegType.UINT),
+    "uwBatPieceNum": RegDef(81, 1, RegType.UINT, write=int),
+    "wBatLowCutOff": RegDef(82, 1, RegType.UINT, 10),
+    #"NomGridVolt": RegDef(84, 1, RegType.UINT),
+    #"NomGridFreq": RegDef(85, 1, RegType.UINT),
+    #"NomBatVolt": RegDef(86, 1, RegType.UINT),
+    #"NomPvAmps": RegDef(87, 1, RegType.UINT),
+    #"NomAcChgAmps": RegDef(88, 1, RegType.UINT),
+    #"NomOpVolt": RegDef(89, 1, RegType.UINT),
+    #"NomOpFreq": RegDef(90, 1, RegType.UINT),
+    #"NomOpPow": RegDef(91, 1, RegType.UINT),
+    "uwAC2BatVolt": RegDef(95, 1, RegType.UINT, 10, write=lambda x: int(x) * 10),
+    "BypEnable": RegDef(96, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "PowSavingEnable": RegDef(97, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "SpowBalEnable": RegDef(98, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "ClrEnergyToday": RegDef(99, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "ClrEnergyAll": RegDef(100, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "BurnInTestEnable": RegDef(101, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "ManualStartEnable": RegDef(102, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "SciLossChkEnable": RegDef(103, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "BlightEnable": RegDef(104, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "ParaMaxChgAmps": RegDef(105, 1, RegType.UINT),
+    "LiProtocolType": RegDef(106, 1, RegType.UINT, write=int),
+    "AudioAlarmEnable": RegDef(107, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "uwEqEnable": RegDef(108, 1, RegType.UINT, special=bool, write=str2bool2int),
+    "uwEqChgVolt": RegDef(109, 1, RegType.UINT, write=int),
+    "uwEqTime": RegDef(110, 1, RegType.UINT, write=int),
+    "uwEqTimeOut": RegDef(111, 1, RegType.UINT, write=int),
+    "uwEqInterval": RegDef(112, 1, RegType.UINT, write=int),
+    "uwMaxDisChgAmps": RegDef(113, 1, RegType.UINT, write=int),
+    "BLVersion2": RegDef(162, 1, RegType.UINT),
+})
+# fmt: on
+
+
+## Modbus Reads ##
+MAX_READ_REGISTERS = 125  # Modbus limit for a single read request
+MAX_READ_GAP = 32  # unused registers worth reading to save a round trip
+MAX_WRITE_REGISTERS = 123  # Modbus limit for a single write request
+# Writing these triggers an action on the inverter, so they always get a write
+# request of their own instead of being merged with their neighbours
+COMMAND_REGISTERS = frozenset(
+    HoldingAndWriteRegisters[key].start
+    for key in ("FlashStart", "ResetUserInfo", "ResetToFactory")
+)
+
+
+def plan_read_spans(registers: Mapping[str, RegDef]) -> List[Tuple[int, int]]:
+    """Plan the minimal set of contiguous reads covering the given registers.
+
+    Adjacent registers are merged into one read as long as the gap between
+    them is small and the read stays within the Modbus per-request limit.
+
+    Args:
+        registers (Mapping[str, RegDef]): The register table to cover.
+
+    Returns:
+        List[Tuple[int, int]]: A list of (start, count) tuples sorted by start."""
+    spans = []
+    for reg in sorted(registers.values(), key=lambda x: x.start):
+        start, end = reg.start, reg.start + reg.length
+        if spans:
+            span_start, span_end = spans[-1]
+            if (
+                start - span_end <= MAX_READ_GAP
+                and end - span_start <= MAX_READ_REGISTERS
+            ):
+                spans[-1] = (span_start, max(span_end, end))
+                continue
+        spans.append((start, end))
+    return [(start, end - start) for start, end in spans]
+
 
+_HOLDING_SPANS = plan_read_spans(HoldingAndWriteRegisters)  # [(0, 114), (162, 1)]
+
+
+@functools.cache
+def register_struct(count: int) -> struct.Struct:
+    """Return a struct for a block of big-endian 16-bit registers.
+
+    Args:
+        count (int): The number of registers in the block."""
+    return struct.Struct(f">{count}H")
 
-def generate_index_html():
+
+def decode_char_special(special: Optional[Callable]) -> Callable:
+    """Return a function decoding CHAR bytes before applying special, if any."""
+    if special is None:
+        return lambda data: data.decode("utf-8")
+    return lambda data: special(data.decode("utf-8"))
+
+
+def build_register_struct(
+    registers: Mapping[str, RegDef],
+) -> Tuple[struct.Struct, List[Tuple[str, int, Optional[Callable]]]]:
+    """Build a struct that decodes every register of the table in a single call.
+
+    Unused registers between entries are skipped with pad bytes, so the struct
+    can unpack a contiguous big-endian block of registers starting at 0.
+
+    Args:
+        registers (Mapping[str, RegDef]): The register table to decode.
+
+    Returns:
+        Tuple[struct.Struct, List[Tuple[str, int, Optional[Callable]]]]: The struct
+            and the (key, scale, special) of each unpacked value, in order."""
+    fmt = ">"
+    fields = []
+    offset = 0
+    for key, reg in sorted(registers.items(), key=lambda x: x[1].start):
+        special = reg.special
+        if reg.start > offset:
+            fmt += f"{(reg.start - offset) * 2}x"
+        match reg.type_, reg.length:
+            case RegType.UINT, 1:
+                fmt += "H"
+            case RegType.UINT, 2:
+                fmt += "I"
+            case RegType.INT, 1:
+                fmt += "h"
+            case RegType.INT, 2:
+                fmt += "i"
+            case RegType.CHAR, length:
+                fmt += f"{length * 2}s"
+                special = decode_char_special(special)
+            case _:
+                raise ValueError(f"Unsupported register layout for {key}")
+        fields.append((key, reg.scale, special))
+        offset = reg.start + reg.length
+    return struct.Struct(fmt), fields
+
+
+_INPUT_STRUCT, _INPUT_FIELDS = build_register_struct(InputRegisters)
+_INPUT_REGISTER_COUNT = _INPUT_STRUCT.size // 2
+_HOLDING_STRUCT, _HOLDING_FIELDS = build_register_struct(HoldingAndWriteRegisters)
+
+
+WRITEABLE_KEYS = tuple(
+    key for key, item in HoldingAndWriteRegisters.items() if item.write is not None
+)
+
+
+@functools.cache
+def generate_index_html() -> bytes:
     """Generates the index HTML page."""
-    index_html = (
+    return (
         "<!DOCTYPE html><html lang='en'><head><title>Growatt</title>"
         "<style>body{font-family:Arial,Helvetica,sans-serif;}</style>"
         "<meta name=viewport content='width=device-width,initial-scale=1'>"
@@ -288,21 +462,40 @@ def generate_index_html():
         "<input type='submit' value='Submit'>"
         "<input type='hidden' name='_method' value='PUT'></form>"
         "<p>Writeable keys:</p><ul>"
-    )
-    for key, item in HoldingAndWriteRegisters.items():
-        if not item[4]:  # not writeable
-            continue
-        index_html += f"<li>{key}</li>"
-    index_html += "</ul></body></html>"
-    index_html = index_html.encode("utf-8")
-    return index_html
+        + "".join(f"<li>{key}</li>" for key in WRITEABLE_KEYS)
+        + "</ul></body></html>"
+    ).encode("utf-8")
 
 
 ## HTTP Server ##
-INDEX_HTML = generate_index_html()
+THREAD_STACK_SIZE = 512 * 1024  # bytes, per connection and worker thread
 CONTENT_TYPE_JSON = "application/json; charset=utf-8"
 CONTENT_TYPE_TEXT = "text/plain; charset=utf-8"
 CONTENT_TYPE_HTML = "text/html; charset=utf-8"
+INDEX_HTML = generate_index_html()
+INDEX_HTML_HEADERS = (
+    f"Content-Type: {CONTENT_TYPE_HTML}\r\n"
+    f"Content-Length: {len(INDEX_HTML)}\r\n"
+    "Vary: Accept-Encoding\r\n"
+).encode("latin-1")
+INDEX_HTML_GZ = gzip.compress(INDEX_HTML, 9, mtime=0)
+INDEX_HTML_GZ_HEADERS = (
+    f"Content-Type: {CONTENT_TYPE_HTML}\r\n"
+    f"Content-Length: {len(INDEX_HTML_GZ)}\r\n"
+    "Content-Encoding: gzip\r\n"
+    "Vary: Accept-Encoding\r\n"
+).encode("latin-1")
+UNAUTHORIZED_BODY = b"Unauthorized"
+UNAUTHORIZED_HEADERS = (
+    f"Content-Type: {CONTENT_TYPE_TEXT}\r\n"
+    f"Content-Length: {len(UNAUTHORIZED_BODY)}\r\n"
+    'WWW-Authenticate: Basic realm="Growatt"\r\n'
+    "Connection: close\r\n"
+).encode("latin-1")
+MAX_ACCEPTED_AUTH_HEADERS = 8  # bounded so header spraying can't grow it
+# Each scrypt check takes ~16 MiB and tens of ms of CPU, so bogus credentials
+# sent over many parallel connections queue here instead of exhausting the host
+SCRYPT_CHECKS = BoundedSemaphore(2)
 
 
 class GrowattModbusClient:
@@ -329,6 +522,16 @@ class GrowattModbusClient:
             parity="N",
         )
         self.lock = Lock()
+        self.next_available = 0.0
+
+    def wait_until_available(self):
+        """Wait until the minimum wait time after the last command has passed.
+
+        Must be called with the lock held."""
+        wait_time = self.next_available - monotonic()
+        if wait_time > 0:
+            # Wait for the minimum per Growatt Modbus documentation
+            sleep(wait_time)
 
     @staticmethod
     def lock_wrapper(enforce_wait_time: bool):
@@ -343,40 +546,18 @@ class GrowattModbusClient:
 
             def wrapper(self: "GrowattModbusClient", *args, **kwargs):
                 """Wrapper function to lock the function call."""
-
-                def wait_and_release():
-                    """Release the lock after the minimum wait time."""
-
-                    # Wait for the minimum per Growatt Modbus documentation
-                    sleep(self.MIN_WAIT_TIME_BETWEEN_CMDS)
-
-                    # Release the lock after waiting for the minimum time
-                    self.lock.release()
-
-                try:
-                    # Acquire the lock before calling the function
-                    self.lock.acquire()
-
-                    # Call the function with the lock acquired
-                    return func(self, *args, **kwargs)
-                finally:
-                    if enforce_wait_time:
-                        # Release the lock after the function call
-                        # while enforcing the minimum wait time.
-                        try:
-                            # Start a new thread to wait and release the lock
-                            # to prevent blocking the request handler.
-                            Thread(target=wait_and_release).start()
-                        except Exception as exc:  # pylint: disable=broad-except
-                            # Print the exception to stderr.
-                            sys.stderr.write(f"[ERROR] {exc}\n")
-
-                            # If we can't start a new thread, just wait and release.
-                            # This might happen when we run out of resources.
-                            wait_and_release()
-                    else:
-                        # Release the lock after the function call
-                        self.lock.release()
+                with self.lock:
+                    self.wait_until_available()
+                    try:
+                        # Call the function with the lock acquired
+                        return func(self, *args, **kwargs)
+                    finally:
+                        if enforce_wait_time:
+                            # Hold off the next command for the minimum wait
+                            # time without keeping the lock busy meanwhile.
+                            self.next_available = (
+                                monotonic() + self.MIN_WAIT_TIME_BETWEEN_CMDS
+                            )
 
             return wrapper
 
@@ -409,28 +590,125 @@ class GrowattModbusClient:
 
     def write_registers_unsafe(self, address: int, values: List[int]):
         """Write multiple registers to the Modbus server without
-        holding the lock or enforcing the wait time.
-
-        This is useful when the operation is time-sensitive and
-        we want to ensure that the value is written as soon as
-        possible. This is useful for setting the inverter's time."""
+        holding the lock or enforcing the wait time."""
         return self.client.write_registers(address, values)
 
     @lock_wrapper(enforce_wait_time=True)
-    def write_registers(self, address: int, values: List[int]):
-        """Write multiple registers to the Modbus server."""
+    def write_registers(
+        self, address: int, values: Union[List[int], Callable[[], List[int]]]
+    ):
+        """Write multiple registers to the Modbus server.
+
+        Args:
+            address (int): The address of the first register.
+            values (Union[List[int], Callable[[], List[int]]]): The values to write,
+                or a function returning them. The function is only called once
+                the lock is held and the wait time has passed, which is useful
+                for time-sensitive values such as the inverter's time."""
+        if callable(values):
+            values = values()
         return self.write_registers_unsafe(address, values)
 
 
-class GrowattInverter:
+class TTLCache:  # pylint: disable=too-many-instance-attributes
+    """Caches the result of a function for a limited time.
+
+    Concurrent callers that find the cached value stale wait for a single
+    refresh instead of each calling the function, so a burst of requests
+    results in only one Modbus transaction. A background poller can call
+    refresh to replace the value before it goes stale, in which case callers
+    keep getting the current value and never wait."""
+
+    def __init__(self, func: Callable[[], Any], ttl: float):
+        """
+        Args:
+            func (Callable[[], Any]): The function producing the value.
+            ttl (float): The time in seconds a value stays fresh.
+        """
+        self.func = func
+        self.ttl = ttl
+        self.condition = Condition()
+        self.refreshing = False
+        self.valid = False
+        self.generation = 0
+        self.timestamp = 0.0
+        self.value = None
+
+    def invalidate(self):
+        """Mark the cached value, and any refresh still in flight, as stale."""
+        with self.condition:
+            self.valid = False
+            self.generation += 1
+
+    def get(self) -> Any:
+        """Return the cached value, refreshing it if it is stale."""
+        with self.condition:
+            while not (self.valid and monotonic() - self.timestamp < self.ttl):
+                if not self.refreshing:
+                    self.refreshing = True
+                    break
+                self.condition.wait()
+            else:
+                return self.value
+        return self.fetch()
+
+    def refresh(self, max_age: float = 0) -> Any:
+        """Refresh the cached value unless it is newer than max_age.
+
+        Args:
+            max_age (float): The age in seconds below which the value is kept."""
+        with self.condition:
+            while self.refreshing:
+                self.condition.wait()
+            if self.valid and monotonic() - self.timestamp < max_age:
+                return self.value
+            self.refreshing = True
+        return self.fetch()
+
+    def fetch(self) -> Any:
+        """Call the function and store its result; the caller sets refreshing."""
+        try:
+            with self.condition:
+                generation = self.generation
+            timestamp = monotonic()
+            value = self.func()
+            with self.condition:
+                # An invalidate during the call means the value may predate it
+                if generation == self.generation:
+                    self.value = value
+                    self.timestamp = timestamp
+                    self.valid = True
+            return value
+        finally:
+            with self.condition:
+                self.refreshing = False
+                self.condition.notify_all()
+
+
+class GrowattInverter:  # pylint: disable=too-many-instance-attributes
     """Class to interact with a Growatt inverter using Modbus RTU."""
 
-    def __init__(self, port: str):
+    def __init__(
+        self,
+        port: str,
+        status_ttl: float = 0.5,
+        config_ttl: float = 5,
+        poll_interval: float = 0,
+    ):
         """Initialize the Growatt inverter.
 
         Args:
-            port (str): The serial port to use (e.g. "/dev/ttyUSB0")."""
+            port (str): The serial port to use (e.g. "/dev/ttyUSB0").
+            status_ttl (float): The time in seconds to cache the system status.
+            config_ttl (float): The time in seconds to cache the configuration.
+            poll_interval (float): The time in seconds between background cache
+                refreshes, or 0 to only read the inverter when a request needs it."""
         self.client = GrowattModbusClient(port)
+        self.status_cache = TTLCache(self.fetch_status, status_ttl)
+        self.config_cache = TTLCache(self.fetch_config, config_ttl)
+        self.poll_interval = poll_interval
+        self.poll_thread = Thread(target=self.poll)
+        self.poll_event = Event()
         self.sync_time_thread = Thread(target=self.sync_time)
         self.sync_time_event = Event()
         self.write_queue = Queue()
@@ -444,6 +722,8 @@ class GrowattInverter:
             self.sync_time_thread.start()
         if not self.write_thread.is_alive():
             self.write_thread.start()
+        if self.poll_interval > 0 and not self.poll_thread.is_alive():
+            self.poll_thread.start()
 
     def close(self):
         """Close the connection to the Modbus server and stop the datetime thread."""
@@ -454,50 +734,107 @@ class GrowattInverter:
         self.write_event.set()
         if self.write_thread.is_alive():
             self.write_thread.join()
+        self.poll_event.set()
+        if self.poll_thread.is_alive():
+            self.poll_thread.join()
+
+    def poll(self):
+        """Refresh the caches that would go stale before the next poll."""
+        while not self.poll_event.wait(timeout=self.poll_interval):
+            for cache in (self.status_cache, self.config_cache):
+                try:
+                    cache.refresh(cache.ttl - self.poll_interval)
+                except Exception as exc:  # pylint: disable=broad-except
+                    sys.stderr.write(f"[ERROR] Failed to poll the inverter: {exc}\n")
 
     def sync_time(self):
-        """Update the inverter's time every 720 seconds."""
+        """Schedule an update of the inverter's time every 720 seconds."""
         update_interval = 720  # seconds
         while True:
-            try:
-                self.client.lock.acquire()  # pylint: disable=consider-using-with
-                sleep(int(time() + 1) - time())  # Wait until the next exact second
-                now = datetime.now()
-                values = [
-                    now.year,  # SysYear (45)
-                    now.month,  # SysMonth (46)
-                    now.day,  # SysDay (47)
-                    now.hour,  # SysHour (48)
-                    now.minute,  # SysMin (49)
-                    now.second,  # SysSec (50)
-                ]
-                self.client.write_registers_unsafe(
-                    HoldingAndWriteRegisters["SysYear"][0],  # 45
-                    values=values,  # [year, month, day, hour, minute, second]
-                )
-            except Exception as exc:  # pylint: disable=broad-except
-                sys.stderr.write(f"[ERROR] Failed to update time: {exc}\n")
-            finally:
-                sleep(self.client.MIN_WAIT_TIME_BETWEEN_CMDS)
-                self.client.lock.release()
-
+            self.write_queue.put(
+                (HoldingAndWriteRegisters["SysYear"].start, self.current_time_registers)
+            )
             if self.sync_time_event.wait(timeout=update_interval):
                 break
 
+    @staticmethod
+    def current_time_registers() -> List[int]:
+        """Wait until the next exact second and return the time registers."""
+        # Wait until the next exact second
+        ns_per_second = 1_000_000_000
+        sleep((ns_per_second - time_ns() % ns_per_second) / ns_per_second)
+        now = datetime.now()
+        return [
+            now.year,  # SysYear (45)
+            now.month,  # SysMonth (46)
+            now.day,  # SysDay (47)
+            now.hour,  # SysHour (48)
+            now.minute,  # SysMin (49)
+            now.second,  # SysSec (50)
+        ]
+
     def write_registers(self):
         """Write registers to the inverter from queue every second."""
         update_interval = 1  # seconds
         while not self.write_event.wait(timeout=update_interval):
-            requested = {}
-            while not self.write_queue.empty():
-                start, values = self.write_queue.get_nowait()
-                requested[start] = values
-
-            for start, values in requested.items():
+            queued: List[Tuple[int, List[int]]] = []
+            deferred: Dict[int, Callable[[], List[int]]] = {}
+            while True:
                 try:
-                    self.client.write_registers(start, values)
-                except Exception as exc:  # pylint: disable=broad-except
-                    sys.stderr.write(f"[ERROR] Failed to write registers: {exc}\n")
+                    start, values = self.write_queue.get_nowait()
+                except Empty:
+                    break
+                if callable(values):
+                    deferred[start] = values
+                    continue
+                queued.append((start, values))
+
+            # Time-sensitive writes go last so nothing delays them once computed.
+            # The config cache is invalidated after each batch, so the deferred
+            # writes' wait for the inverter doesn't keep serving the old config.
+            for writes in (self.coalesce_writes(queued), deferred.items()):
+                for start, values in writes:
+                    try:
+                        self.client.write_registers(start, values)
+                    except Exception as exc:  # pylint: disable=broad-except
+                        sys.stderr.write(f"[ERROR] Failed to write registers: {exc}\n")
+                if writes:
+                    self.config_cache.invalidate()
+
+    @staticmethod
+    def coalesce_writes(
+        queued: List[Tuple[int, List[int]]],
+    ) -> List[Tuple[int, List[int]]]:
+        """Merge queued writes that continue right where the previous one ended.
+
+        The queue order is kept, so every register is written in the same order
+        as with one request per queued write. Writes touching a command register
+        are never merged.
+
+        Args:
+            queued (List[Tuple[int, List[int]]]): The (start, values) writes in
+                the order they were queued.
+
+        Returns:
+            List[Tuple[int, List[int]]]: The (start, values) of each write request."""
+        runs: List[Tuple[int, List[int]]] = []
+        previous_is_command = False
+        for start, values in queued:
+            is_command = not COMMAND_REGISTERS.isdisjoint(
+                range(start, start + len(values))
+            )
+            if (
+                runs
+                and not is_command
+                and not previous_is_command
+                and start == runs[-1][0] + len(runs[-1][1])
+                and len(runs[-1][1]) + len(values) <= MAX_WRITE_REGISTERS
+            ):
+                runs[-1][1].extend(values)
+            else:
+                runs.append((start, list(values)))
+            previous_is_command = is_command
+        return runs
 
     @staticmethod
     def registers_to_bytes(
@@ -509,10 +846,7 @@ class GrowattInverter:
             registers (List[int]): The registers to convert.
             start (int): The start index of the registers.
             length (int): The number of registers to convert."""
-        return b"".join(
-            bytes([registers[start + i] >> 8, registers[start + i] & 0xFF])
-            for i in range(length)
-        )
+        return register_struct(length).pack(*registers[start : start + length])
 
     @staticmethod
     def bytes_to_registers(data: bytes) -> List[int]:
@@ -524,7 +858,7 @@ class GrowattInverter:
 
         Returns:
             List[int]: The registers"""
-        return [data[i] << 8 | data[i + 1] for i in range(0, len(data), 2)]
+        return list(register_struct(len(data) // 2).unpack(data))
 
     @staticmethod
     def combine_registers(
@@ -552,61 +886,67 @@ class GrowattInverter:
         return GrowattInverter.bytes_to_registers(data)
 
     @staticmethod
-    def registers_to_char(registers: List[int], start: int = 0, length: int = 1) -> str:
-        """Convert multiple registers to a string.
+    def decode_registers(
+        layout: struct.Struct,
+        fields: List[Tuple[str, int, Optional[Callable]]],
+        data: Union[bytes, bytearray],
+    ) -> Dict[str, Any]:
+        """Decode a block of registers starting at 0 into a dict.
 
         Args:
-            registers (List[int]): The registers to convert.
-            start (int): The start index of the registers.
-            length (int): The number of registers to convert."""
-        data = GrowattInverter.registers_to_bytes(registers, start, length)
-        return data.decode("utf-8")
+            layout (struct.Struct): The struct from build_register_struct.
+            fields (List[Tuple[str, int, Optional[Callable]]]): The fields
+                from build_register_struct.
+            data (Union[bytes, bytearray]): The big-endian register data."""
+        info = {}
+        for (key, scale, special), value in zip(fields, layout.unpack_from(data)):
+            if special is not None:
+                value = special(value)
+            elif scale != 1:
+                value /= scale
+            info[key] = value
+
+        return info
+
+    def read_status(self):
+        """Read the system status and other information from the inverter,
+        served from cache if it was read recently."""
+        return self.status_cache.get()
+
+    def read_config(self):
+        """Read the system configuration from the inverter,
+        served from cache if it was read recently."""
+        return self.config_cache.get()
 
     @staticmethod
-    def generic_read_postprocess(
-        registers: List[int], start: int, length: int, type_: RegType
-    ):
-        """Generic postprocess function for read registers.
+    def response_registers(row, count: int) -> List[int]:
+        """Return the registers of a read response after checking it is complete.
 
         Args:
-            registers (List[int]): The registers to read.
-            start (int): The start index of the registers.
-            length (int): The number of registers to read.
-            type_ (RegType): The register type."""
-        match type_:
-            case RegType.UINT | RegType.INT:
-                return GrowattInverter.combine_registers(
-                    registers, start, length, signed=type_ == RegType.INT
-                )
-            case RegType.CHAR:
-                return GrowattInverter.registers_to_char(registers, start, length)
-            case _:
-                raise ValueError("Invalid register type")
+            row: The read response.
+            count (int): The number of registers requested.
 
-    def read_status(self):
-        """Read the system status and other information from the inverter."""
-        row = self.client.read_input_registers(0, 91)
-        reg = row.registers
-        info = {}
-        for key, value in InputRegisters.items():
-            start, length, type_, postprocess = value
-            info[key] = self.generic_read_postprocess(reg, start, length, type_)
-            info[key] = postprocess(info[key])
+        Raises:
+            ModbusException: If the response is an error or has the wrong length."""
+        if row.isError() or len(row.registers) != count:
+            raise ModbusException(f"Invalid response to read of {count} registers")
+        return row.registers
 
-        return info
+    def fetch_status(self):
+        """Read the system status and other information from the inverter."""
+        row = self.client.read_input_registers(0, _INPUT_REGISTER_COUNT)
+        registers = self.response_registers(row, _INPUT_REGISTER_COUNT)
+        data = self.registers_to_bytes(registers, 0, _INPUT_REGISTER_COUNT)
+        return self.decode_registers(_INPUT_STRUCT, _INPUT_FIELDS, data)
 
-    def read_config(self):
+    def fetch_config(self):
         """Read the system configuration from the inverter."""
-        row1 = self.client.read_holding_registers(0, 101)  # 0-100
-        row2 = self.client.read_holding_registers(101, 62)  # 101-162
-        reg = row1.registers + row2.registers
-        info = {}
-        for key, value in HoldingAndWriteRegisters.items():
-            start, length, type_, readpostprocess, _ = value
-            info[key] = self.generic_read_postprocess(reg, start, length, type_)
-            info[key] = readpostprocess(info[key])
-
-        return info
+        data = bytearray(_HOLDING_STRUCT.size)
+        for start, count in _HOLDING_SPANS:
+            row = self.client.read_holding_registers(start, count)
+            registers = self.response_registers(row, count)
+            register_struct(count).pack_into(data, start * 2, *registers)
+        return self.decode_registers(_HOLDING_STRUCT, _HOLDING_FIELDS, data)
 
     def write_config(self, key: str, value: Union[str, int, float]):
         """Schedule a config write to the inverter to be processed by the write thread.
@@ -615,7 +955,7 @@ class GrowattInverter:
             key (str): The configuration key to write.
             value (Union[str, int, float]): The value to write."""
         try:
-            start, length, type_, _, writepreprocess = HoldingAndWriteRegisters[key]
+            start, length, type_, _, _, writepreprocess = HoldingAndWriteRegisters[key]
         except KeyError as exc:
             raise KeyError("Invalid key") from exc
         if not writepreprocess:
@@ -623,23 +963,22 @@ class GrowattInverter:
 
         try:
             value = writepreprocess(value)
-        except (ValueError, KeyError) as exc:
+        except (ValueError, OverflowError, KeyError) as exc:
             raise ValueError("Invalid value") from exc
 
         match type_:
             case RegType.UINT | RegType.INT:
-                values = self.uncombine_registers(
-                    value, length, signed=type_ == RegType.INT
-                )
+                try:
+                    values = self.uncombine_registers(
+                        value, length, signed=type_ == RegType.INT
+                    )
+                except OverflowError as exc:
+                    raise ValueError("Invalid value") from exc
             case RegType.CHAR:
-                values = list(value.encode("utf-8"))
-                values = [
-                    values[i] << 8 | values[i + 1] if i + 1 < len(values) else values[i]
-                    for i in range(0, len(values), 2)
-                ]
-                values += [0] * (length - len(values))  # pad with zeros
-                if len(values) != length:
+                data = value.encode("utf-8")
+                if len(data) > length * 2:
                     raise ValueError("Invalid value length")
+                values = self.bytes_to_registers(data.ljust(length * 2, b"\0"))
             case _:
                 raise ValueError("Invalid register type")
 
@@ -647,45 +986,152 @@ class GrowattInverter:
 
 
 @dataclass
-class GrowattHTTPAuth:
+class GrowattHTTPAuth:  # pylint: disable=too-many-instance-attributes
     """Growatt HTTP authentication dataclass."""
 
     username: str
     password_hash: str
     password_salt: str
+    username_bytes: bytes = field(init=False, repr=False)
+    password_hmac: Optional["hmac.HMAC"] = field(init=False, repr=False)
+    password_digest: bytes = field(init=False, repr=False)
+    accepted_headers: Tuple[bytes, ...] = field(default=(), init=False, repr=False)
+    accepted_headers_lock: Lock = field(default_factory=Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        """Decode the expected digest and, for legacy hashes, precompute the HMAC."""
+        self.username_bytes = bytes(self.username, "utf-8")
+        is_scrypt = self.password_hash.startswith(hash_pass.SCRYPT_PREFIX)
+        try:
+            self.password_digest = bytes.fromhex(
+                self.password_hash.removeprefix(hash_pass.SCRYPT_PREFIX)
+            )
+        except ValueError as exc:
+            raise ValueError(
+                "PASS_HASH is not a hash generated by hash_pass.py "
+                f"({self.password_hash!r})"
+            ) from exc
+        if is_scrypt:
+            self.password_hmac = None
+        else:
+            self.password_hmac = hash_pass.password_hmac(self.password_salt)
+
+    def verify_password(self, password: str) -> bool:
+        """Check the password against the stored hash in constant time.
+
+        Args:
+            password (str): The password."""
+        if self.password_hmac is None:
+            with SCRYPT_CHECKS:
+                digest = hash_pass.scrypt_digest(password, self.password_salt)
+        else:
+            password_hmac = self.password_hmac.copy()
+            password_hmac.update(bytes(password, "utf-8"))
+            digest = password_hmac.digest()
+        return hmac.compare_digest(digest, self.password_digest)
+
+    def is_accepted_header(self, header: bytes) -> bool:
+        """Whether the raw Authorization header already passed a full check.
+
+        Args:
+            header (bytes): The raw Authorization header."""
+        # Read without the lock: the tuple is only ever replaced, never mutated
+        return any(
+            hmac.compare_digest(header, accepted) for accepted in self.accepted_headers
+        )
+
+    def remember_accepted_header(self, header: bytes):
+        """Remember a raw Authorization header that passed a full check.
+
+        Args:
+            header (bytes): The raw Authorization header."""
+        with self.accepted_headers_lock:
+            if header not in self.accepted_headers:
+                self.accepted_headers = (
+                    *self.accepted_headers[1 - MAX_ACCEPTED_AUTH_HEADERS :],
+                    header,
+                )
+
+    def check(self, username: str, password: str) -> bool:
+        """Check the username and password in constant time.
+
+        Args:
+            username (str): The username.
+            password (str): The password."""
+        # Both checks always run and compare in constant time, so the response
+        # time reveals neither which one failed nor how much of it matched.
+        username_valid = hmac.compare_digest(
+            bytes(username, "utf-8"), self.username_bytes
+        )
+        password_valid = self.verify_password(password)
+        return username_valid & password_valid
+
+
+class EncodedJSON:  # pylint: disable=too-few-public-methods
+    """JSON encoding of the last value seen, with a gzip variant made on demand.
+
+    The inverter caches hand out the same dict until they are refreshed,
+    and a refreshed dict often holds the same data as the previous one,
+    so the encoding and its ETag are only redone when the data changes."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.source = None
+        self.body = b""
+        self.gzip_body: Optional[bytes] = None
+        self.etag = ""
+
+    def encode(self, value: Any, use_gzip: bool = False) -> Tuple[bytes, str]:
+        """Return the JSON encoding of the value and its ETag.
+
+        Args:
+            value (Any): The value to encode.
+            use_gzip (bool): Whether to return the gzip-compressed encoding."""
+        with self.lock:
+            if value is not self.source:
+                if value != self.source:
+                    self.body = dump_json(value)
+                    self.gzip_body = None
+                    digest = hashlib.blake2b(self.body, digest_size=8).hexdigest()
+                    self.etag = f'W/"{digest}"'
+                self.source = value
+            if not use_gzip:
+                return self.body, self.etag
+            if self.gzip_body is None:
+                self.gzip_body = gzip.compress(self.body, mtime=0)
+            return self.gzip_body, self.etag
+
+
+@functools.lru_cache(maxsize=1)
+def format_log_date_time(second: int) -> str:
+    """Format a log timestamp the way BaseHTTPRequestHandler does.
+
+    Args:
+        second (int): The Unix time in whole seconds."""
+    year, month, day, hour, minute, sec, *_ = localtime(second)
+    month_name = BaseHTTPRequestHandler.monthname[month]
+    return f"{day:02d}/{month_name}/{year:04d} {hour:02d}:{minute:02d}:{sec:02d}"
 
 
 class GrowattHTTPHandler(BaseHTTPRequestHandler):
     """
     HTTP request handler for the Growatt inverter.
+
+    The settings below are bound once per server by growatt_http_handler_factory.
     """
 
+    # pylint: disable=too-many-public-methods
+
+    inverter: GrowattInverter
+    timeout: int
+    keep_alive: bool = True
+    x_forwarded_for: bool = False
+    auth: GrowattHTTPAuth
     server_version = ""
     sys_version = ""
-
-    def __init__(
-        self,
-        inverter: GrowattInverter,
-        timeout: int,
-        x_forwarded_for: bool,
-        auth: GrowattHTTPAuth,
-        *args,
-        **kwargs,
-    ):
-        """Initialize the handler.
-
-        Args:
-            inverter (GrowattInverter): The Growatt inverter.
-            timeout (int): The timeout in seconds for the request.
-            x_forwarded_for (bool): Whether to use the X-Forwarded-For header.
-            auth (GrowattHTTPAuth): The authentication data.
-            *args: Passed to the BaseHTTPRequestHandler constructor.
-            **kwargs: Passed to the BaseHTTPRequestHandler constructor."""
-        self.inverter = inverter
-        self.timeout = timeout
-        self.x_forwarded_for = x_forwarded_for
-        self.auth = auth
-        super().__init__(*args, **kwargs)
+    protocol_version = "HTTP/1.1"
+    status_json = EncodedJSON()
+    config_json = EncodedJSON()
 
     @override
     def handle(self):
@@ -706,18 +1152,16 @@ class GrowattHTTPHandler(BaseHTTPRequestHandler):
             return self.headers["X-Forwarded-For"]
         return super().address_string()
 
+    @override
+    def log_date_time_string(self) -> str:
+        """Return the log timestamp, formatting it at most once per second."""
+        return format_log_date_time(time_ns() // 1_000_000_000)
+
     @override
     def version_string(self):
         """Return the server software version string."""
         return "Growatt/1.0"
 
-    @staticmethod
-    def hash_password(password: str, salt: str) -> str:
-        """Hashes the password using the given salt."""
-        return hmac.new(
-            bytes(salt, "utf-8"), bytes(password, "utf-8"), hashlib.sha1
-        ).hexdigest()
-
     def send_final_response(
         self, code: int, headers: Dict[str, str], body: Optional[bytes]
     ):
@@ -728,15 +1172,128 @@ class GrowattHTTPHandler(BaseHTTPRequestHandler):
             headers (Dict[str, str]): The response headers.
             body (Optional[bytes]): The response body.
         """
-        self.send_response(code)
-        for key, value in headers.items():
-            self.send_header(key, value)
-        self.send_header("Content-Length", str(len(body)))
-        if "Connection" not in headers:
-            self.send_header("Connection", "close")
-        self.end_headers()
-        if body and self.command != "HEAD":
-            self.wfile.write(body)
+        lines = [f"{key}: {value}\r\n" for key, value in headers.items()]
+        if body is not None and "Content-Length" not in headers:
+            lines.append(f"Content-Length: {len(body)}\r\n")
+        if headers.get("Connection", "").lower() == "close":
+            self.close_connection = True
+        self.end_response(
+            code,
+            "".join(lines).encode("latin-1", "strict"),
+            "Connection" in headers,
+            body,
+        )
+
+    def send_prepared_response(
+        self,
+        code: int,
+        header_block: bytes,
+        body: Optional[bytes],
+        close_connection: bool = False,
+    ):
+        """Like send_final_response, but with the header lines already encoded.
+
+        Args:
+            code (int): The HTTP status code.
+            header_block (bytes): CRLF-terminated header lines, Content-Length included.
+            body (Optional[bytes]): The response body.
+            close_connection (bool): Whether header_block has Connection: close.
+        """
+        if close_connection:
+            self.close_connection = True
+        self.end_response(code, header_block, close_connection, body)
+
+    def end_response(
+        self,
+        code: int,
+        header_block: bytes,
+        has_connection_header: bool,
+        body: Optional[bytes],
+    ):
+        """Log the request and send the status line, headers, and body.
+
+        Args:
+            code (int): The HTTP status code.
+            header_block (bytes): CRLF-terminated header lines.
+            has_connection_header (bool): Whether header_block has a Connection header.
+            body (Optional[bytes]): The response body.
+        """
+        self.log_request(code)
+        if not has_connection_header and (
+            not self.keep_alive or self.has_request_body()
+        ):
+            # A request body is never read, so such a connection can't be reused
+            header_block += b"Connection: close\r\n"
+            self.close_connection = True
+        if self.command == "HEAD":
+            body = None
+        if self.request_version == "HTTP/0.9":  # no status line or headers
+            if body:
+                self.wfile.write(body)
+            return
+        phrase = self.responses[code][0] if code in self.responses else ""
+        status_block = (
+            f"{self.protocol_version} {code:d} {phrase}\r\n"
+            f"Server: {self.version_string()}\r\n"
+            f"Date: {self.date_time_string()}\r\n"
+        ).encode("latin-1", "strict")
+        # One write for the whole response; the socket writer is unbuffered
+        self.wfile.write(b"".join((status_block, header_block, b"\r\n", body or b"")))
+
+    def has_request_body(self) -> bool:
+        """Whether the request came with a body."""
+        return hasattr(self, "headers") and (
+            self.headers.get("Content-Length", "0").strip() != "0"
+            or "Transfer-Encoding" in self.headers
+        )
+
+    def accepts_gzip(self) -> bool:
+        """Whether the client accepts a gzip-encoded response."""
+        for coding in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = coding.partition(";")
+            if name.strip().lower() == "gzip":
+                _, _, qvalue = params.partition("q=")
+                try:
+                    return float(qvalue or 1) > 0
+                except ValueError:
+                    return False
+        return False
+
+    def etag_matches(self, etag: str) -> bool:
+        """Whether the If-None-Match header matches the ETag.
+
+        Args:
+            etag (str): The ETag of the current representation."""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is None:
+            return False
+        opaque_tag = etag.removeprefix("W/")
+        return any(
+            tag == "*" or tag.removeprefix("W/") == opaque_tag
+            for tag in map(str.strip, if_none_match.split(","))
+        )
+
+    def send_json(self, encoded: EncodedJSON, value: Any, max_age: float):
+        """Send a JSON response, gzip-compressed if the client accepts it.
+
+        Args:
+            encoded (EncodedJSON): The encoding cache for the endpoint.
+            value (Any): The value to send.
+            max_age (float): The time in seconds the value stays cached."""
+        use_gzip = self.accepts_gzip()
+        body, etag = encoded.encode(value, use_gzip)
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": f"max-age={int(max_age)}",
+        }
+        if self.etag_matches(etag):
+            self.send_final_response(HTTPStatus.NOT_MODIFIED, headers, None)
+            return
+        headers["Content-Type"] = CONTENT_TYPE_JSON
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+        self.send_final_response(HTTPStatus.OK, headers, body)
 
     @override
     def send_error(
@@ -776,7 +1333,7 @@ class GrowattHTTPHandler(BaseHTTPRequestHandler):
                 "message": message,
                 "explain": explain,
             }
-            body = json_dumps(content, indent=4).encode("utf-8")
+            body = dump_json(content)
 
         self.send_final_response(
             code,
@@ -790,15 +1347,26 @@ class GrowattHTTPHandler(BaseHTTPRequestHandler):
         Args:
             username (str): The username.
             password (str): The password."""
-        return (
-            username == self.auth.username
-            and GrowattHTTPHandler.hash_password(password, self.auth.password_salt)
-            == self.auth.password_hash
-        )
+        return self.auth.check(username, password)
 
     def validate_basic_auth_header(self, authorization_header: str) -> bool:
         """Validate the Authorization header.
 
+        Args:
+            authorization_header (str): The Authorization header."""
+        header = bytes(authorization_header, "latin-1")
+        # Headers that already passed skip the base64 decode and the HMAC.
+        # Only accepted headers are remembered, so bad ones are always checked.
+        if self.auth.is_accepted_header(header):
+            return True
+        if not self.check_basic_auth_header(authorization_header):
+            return False
+        self.auth.remember_accepted_header(header)
+        return True
+
+    def check_basic_auth_header(self, authorization_header: str) -> bool:
+        """Decode the Authorization header and check its credentials.
+
         Args:
             authorization_header (str): The Authorization header."""
         try:
@@ -806,11 +1374,11 @@ class GrowattHTTPHandler(BaseHTTPRequestHandler):
             if auth_type.lower() != "basic":
                 return False
             auth_string = base64.b64decode(auth_string).decode("utf-8")
-            if ":" not in auth_string:
-                return False
-            return self.check_auth(*auth_string.split(":", 1))
-        except binascii.Error:
+        except ValueError:  # also covers binascii.Error and UnicodeDecodeError
+            return False
+        if ":" not in auth_string:
             return False
+        return self.check_auth(*auth_string.split(":", 1))
 
     @staticmethod
     def auth_required(func):
@@ -825,28 +1393,77 @@ class GrowattHTTPHandler(BaseHTTPRequestHandler):
             ):
                 return func(self, *args, **kwargs)
 
-            self.send_final_response(
+            # Clients without valid credentials don't get to keep the connection
+            self.send_prepared_response(
                 HTTPStatus.UNAUTHORIZED,
-                {
-                    "Content-Type": CONTENT_TYPE_TEXT,
-                    "WWW-Authenticate": 'Basic realm="Growatt"',
-                },
-                b"Unauthorized",
+                UNAUTHORIZED_HEADERS,
+                UNAUTHORIZED_BODY,
+                close_connection=True,
             )
             return None
 
         return wrapper
 
-    def parse_path_qs(self):
-        """Parse the path and query string.
+    def parse_path_qs(self) -> Tuple[str, str]:
+        """Split the request path from its query string.
 
         Returns:
-            Tuple[str, Dict[str, List[str]]]: The path and query string."""
-        path = self.path.split("?")
-        qs = parse_qs(path[1]) if len(path) > 1 else {}
-        path = path[0]  # ignore query string
+            Tuple[str, str]: The path and the raw query string."""
+        path, _, qs = self.path.partition("?")
         return path, qs
 
+    @staticmethod
+    def query_value(qs: str, key: str) -> Optional[str]:
+        """Return the first non-blank value of a key in a query string.
+
+        Args:
+            qs (str): The raw query string.
+            key (str): The key to look for."""
+        if qs:
+            for name, value in parse_qsl(qs):
+                if name == key:
+                    return value
+        return None
+
+    def serve_index(self):
+        """Send the index page."""
+        if self.accepts_gzip():
+            self.send_prepared_response(
+                HTTPStatus.OK, INDEX_HTML_GZ_HEADERS, INDEX_HTML_GZ
+            )
+        else:
+            self.send_prepared_response(HTTPStatus.OK, INDEX_HTML_HEADERS, INDEX_HTML)
+
+    def serve_status(self):
+        """Send the inverter status."""
+        try:
+            self.send_json(
+                self.status_json,
+                self.inverter.read_status(),
+                self.inverter.status_cache.ttl,
+            )
+        except ModbusException as exc:
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(exc))
+
+    def serve_config(self):
+        """Send the inverter config."""
+        try:
+            self.send_json(
+                self.config_json,
+                self.inverter.read_config(),
+                self.inverter.config_cache.ttl,
+            )
+        except ModbusException as exc:
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(exc))
+
+    get_routes: Mapping[str, Callable[["GrowattHTTPHandler"], None]] = MappingProxyType(
+        {
+            "/": serve_index,
+            "/status": serve_status,
+            "/config": serve_config,
+        }
+    )
+
     @auth_required
     @override
     def do_HEAD(self):  # pylint: disable=invalid-name
@@ -859,55 +1476,30 @@ class GrowattHTTPHandler(BaseHTTPRequestHandler):
         """Handle GET requests."""
         path, qs = self.parse_path_qs()
 
-        if "_method" in qs:
-            match method := qs["_method"][0].upper():
-                case "PUT":
-                    self.do_PUT()
-                case "GET":
-                    pass  # continue with GET
-                case "HEAD":
+        method = self.query_value(qs, "_method")
+        if method is not None:
+            method = method.upper()
+            if method != "GET":  # GET continues with the routes below
+                method_handler = self.method_overrides.get(method)
+                if method_handler is not None:
+                    method_handler(self)
+                elif method == "HEAD":
                     self.send_error(
                         HTTPStatus.BAD_REQUEST,
                         "HEAD method not supported for _method",
                     )
-                case _:
+                else:
                     self.send_error(
                         HTTPStatus.NOT_IMPLEMENTED,
                         f"Unsupported method ({method!r})",
                     )
-            return
+                return
 
-        match path:
-            case "/":
-                self.send_final_response(
-                    HTTPStatus.OK,
-                    {"Content-Type": CONTENT_TYPE_HTML},
-                    INDEX_HTML,
-                )
-            case "/status":
-                try:
-                    self.send_final_response(
-                        HTTPStatus.OK,
-                        {"Content-Type": CONTENT_TYPE_JSON},
-                        json_dumps(self.inverter.read_status(), indent=4).encode(
-                            "utf-8"
-                        ),
-                    )
-                except ModbusException as exc:
-                    self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(exc))
-            case "/config":
-                try:
-                    self.send_final_response(
-                        HTTPStatus.OK,
-                        {"Content-Type": CONTENT_TYPE_JSON},
-                        json_dumps(self.inverter.read_config(), indent=4).encode(
-                            "utf-8"
-                        ),
-                    )
-                except ModbusException as exc:
-                    self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(exc))
-            case _:
-                self.send_error(HTTPStatus.NOT_FOUND, "Not Found")
+        route = self.get_routes.get(path)
+        if route is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "Not Found")
+            return
+        route(self)
 
     @auth_required
     @override
@@ -919,24 +1511,21 @@ class GrowattHTTPHandler(BaseHTTPRequestHandler):
             self.send_error(HTTPStatus.NOT_FOUND, "Not Found")
             return
 
-        if "key" not in qs or "value" not in qs:
+        key = self.query_value(qs, "key")
+        value = self.query_value(qs, "value")
+        if key is None or value is None:
             self.send_error(HTTPStatus.BAD_REQUEST, "Invalid query")
             return
 
-        key = qs["key"][0]
-        value = qs["value"][0]
-
         try:
-            value = float(value)
+            number = float(value)
         except ValueError:
             pass  # allow string value if conversion fails
-
-        try:
-            value_int = int(value)
-            if abs(value_int - value) < 1e-3:
-                value = value_int
-        except ValueError:
-            pass  # allow float value if conversion fails
+        else:
+            if not math.isfinite(number):
+                self.send_error(HTTPStatus.BAD_REQUEST, "Invalid value")
+                return
+            value = int(number) if number.is_integer() else number
 
         try:
             self.inverter.write_config(key, value)
@@ -950,30 +1539,47 @@ class GrowattHTTPHandler(BaseHTTPRequestHandler):
         except ModbusException as exc:
             self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(exc))
 
+    method_overrides: Mapping[str, Callable[["GrowattHTTPHandler"], None]] = (
+        MappingProxyType({"PUT": do_PUT})
+    )
+
 
 def growatt_http_handler_factory(
     *,
     inverter: GrowattInverter,
     timeout: int,
+    keep_alive: bool,
     x_forwarded_for: bool,
     auth: GrowattHTTPAuth,
-):
-    """Factory function to create a GrowattHTTPHandler instance.
+) -> type[GrowattHTTPHandler]:
+    """Factory function to create a GrowattHTTPHandler subclass bound to the settings.
 
     Args:
         inverter (GrowattInverter): The Growatt inverter.
         timeout (int): The timeout in seconds for the request.
+        keep_alive (bool): Whether to keep the connection open between requests.
         x_forwarded_for (bool): Whether to use the X-Forwarded-For header.
         auth (GrowattHTTPAuth): The authentication dataclass."""
-    return lambda *args, **kwargs: GrowattHTTPHandler(
-        inverter, timeout, x_forwarded_for, auth, *args, **kwargs
+    return type(
+        "BoundGrowattHTTPHandler",
+        (GrowattHTTPHandler,),
+        {
+            "inverter": inverter,
+            "timeout": timeout,
+            "keep_alive": keep_alive,
+            "x_forwarded_for": x_forwarded_for,
+            "auth": auth,
+        },
     )
 
 
 def main():
     """Main function."""
+    # Only needed once at startup, so it is not imported with the module
+    import configparser  # pylint: disable=import-outside-toplevel
+
     inverter: Optional[GrowattInverter] = None
-    http_server: Optional[HTTPServer] = None
+    http_server: Optional[ThreadingHTTPServer] = None
     try:
         cfg = configparser.ConfigParser()
         cfg.read("config.ini")
@@ -983,15 +1589,26 @@ def main():
         web_pass_hash = cfg.get("WEB", "PASS_HASH")
         web_addr = cfg.get("WEB", "ADDR")
         web_port = cfg.getint("WEB", "PORT")
+        web_keep_alive = cfg.getboolean("WEB", "KEEP_ALIVE", fallback=True)
         web_timeout = cfg.getint("WEB", "TIMEOUT_SEC")
         web_x_forwarded_for = cfg.getboolean("WEB", "X_FORWARDED_FOR")
 
+        # Each connection gets its own thread which mostly waits on the
+        # inverter, so there is no need for the default 8 MiB stack.
+        stack_size(THREAD_STACK_SIZE)
+
         sys.stderr.write(f"[INFO] Inverter port set to {modbus_port}\n")
         sys.stderr.write(f"[INFO] HTTP Server listening on {web_addr}:{web_port}\n")
-        inverter = GrowattInverter(modbus_port)
+        inverter = GrowattInverter(
+            modbus_port,
+            status_ttl=cfg.getfloat("MODBUS", "STATUS_CACHE_SEC", fallback=0.5),
+            config_ttl=cfg.getfloat("MODBUS", "CONFIG_CACHE_SEC", fallback=5),
+            poll_interval=cfg.getfloat("MODBUS", "POLL_INTERVAL_SEC", fallback=0),
+        )
         http_handler = growatt_http_handler_factory(
             inverter=inverter,
             timeout=web_timeout,
+            keep_alive=web_keep_alive,
             x_forwarded_for=web_x_forwarded_for,
             auth=GrowattHTTPAuth(
                 username=web_user,
@@ -999,7 +1616,7 @@ def main():
                 password_salt=web_pass_salt,
             ),
         )
-        http_server = HTTPServer((web_addr, web_port), http_handler)
+        http_server = ThreadingHTTPServer((web_addr, web_port), http_handler)
         inverter.connect()
         http_server.serve_forever()
     except KeyboardInterrupt:
@@ -6,12 +6,32 @@ import hmac
 import secrets
 from getpass import getpass
 
+SCRYPT_PREFIX = "scrypt$"
+
+
+def password_hmac(salt: str) -> hmac.HMAC:
+    """Return an HMAC keyed with the salt, to be copied for each password."""
+    return hmac.new(bytes(salt, "utf-8"), digestmod=hashlib.sha1)
+
+
+def scrypt_digest(password: str, salt: str) -> bytes:
+    """Derive the scrypt digest of a password using a salt."""
+    return hashlib.scrypt(
+        bytes(password, "utf-8"),
+        salt=bytes(salt, "utf-8"),
+        n=2**14,
+        r=8,
+        p=1,
+        dklen=32,
+    )
+
 
 def hash_password(password: str, salt: str) -> str:
-    """Hash a password using a salt."""
-    return hmac.new(
-        bytes(salt, "utf-8"), bytes(password, "utf-8"), hashlib.sha1
-    ).hexdigest()
+    """Hash a password using a salt.
+
+    Hashes without the scrypt$ prefix are from the old HMAC-SHA1 scheme,
+    which the server still accepts."""
+    return SCRYPT_PREFIX + scrypt_digest(password, salt).hex()
 
 
 def main():